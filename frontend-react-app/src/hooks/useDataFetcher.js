@@ -1,6 +1,7 @@
 // src/hooks/useDataFetcher.js
 
 import { useState, useEffect, useRef } from 'react';
+import { columnsToDataPoints } from '../utils/dataFormatter';
 
 // --- Configuration ---
 const HTTP_API_URL = 'http://localhost:8000/api/initial_data';
@@ -36,7 +37,8 @@ const useDataFetcher = () => {
           throw new Error(`HTTP error! status: ${response.status}`);
         }
 
-        const initialData = await response.json();
+        // The API returns one array per field; zip them back into data points
+        const initialData = columnsToDataPoints(await response.json());
         if (isMounted) {
           setDataPoints(initialData);
           setIsLoading(false);
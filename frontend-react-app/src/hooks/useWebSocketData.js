@@ -1,6 +1,7 @@
 // src/hooks/useWebSocketData.js
 
 import { useState, useEffect } from 'react';
+import { columnsToDataPoints } from '../utils/dataFormatter';
 
 // --- Configuration ---
 // Match these to your Python backend ports
@@ -24,7 +25,8 @@ const useWebSocketData = () => {
         if (!response.ok) {
           throw new Error(`HTTP error! status: ${response.status}`);
         }
-        const initialData = await response.json();
+        // The API returns one array per field; zip them back into data points
+        const initialData = columnsToDataPoints(await response.json());
         
         if (isMounted) {
             setDataPoints(initialData);
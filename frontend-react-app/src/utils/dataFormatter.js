@@ -1,14 +1,14 @@
 // src/utils/dataFormatter.js
 
 /**
- * Formats a raw timestamp string into a readable time.
- * @param {string} isoTimestamp - The ISO 8601 timestamp string from the Python backend.
+ * Formats a raw timestamp into a readable time.
+ * @param {number} timestamp - The epoch-milliseconds (UTC) timestamp from the Python backend.
  * @returns {string} The formatted time string (e.g., "10:30:45 AM").
  */
-export const formatTime = (isoTimestamp) => {
-    if (!isoTimestamp) return '';
+export const formatTime = (timestamp) => {
+    if (!timestamp) return '';
     try {
-        return new Date(isoTimestamp).toLocaleTimeString();
+        return new Date(timestamp).toLocaleTimeString();
     } catch (e) {
         console.error("Invalid timestamp format:", e);
         return 'N/A';
@@ -42,4 +42,24 @@ export const calculateRollingAverage = (dataPoints, windowSize, metricKey = 'pri
 export const formatCurrency = (value) => {
     if (typeof value !== 'number') return '$0.00';
     return `$${value.toLocaleString(undefined, { minimumFractionDigits: 2, maximumFractionDigits: 4 })}`;
-};
\ No newline at end of file
+};
+
+/**
+ * Converts the column-oriented initial data from the Python backend into data points.
+ * @param {Object<string, Array>} columns - One array per data point field (e.g., { price_usd: [...] }), all the same length.
+ * @returns {Array<Object>} The data points (e.g., [{ asset_id: 'BTC', price_usd: 60123.45, ... }]).
+ */
+export const columnsToDataPoints = (columns) => {
+    const fields = Object.keys(columns);
+    const length = fields.length > 0 ? columns[fields[0]].length : 0;
+
+    const dataPoints = new Array(length);
+    for (let i = 0; i < length; i++) {
+        const point = {};
+        for (const field of fields) {
+            point[field] = columns[field][i];
+        }
+        dataPoints[i] = point;
+    }
+    return dataPoints;
+};
@@ -43,7 +43,7 @@ const Dashboard = () => {
     const latestData = uniqueAssets.map(assetId => {
         return dataPoints
             .filter(d => d.asset_id === assetId)
-            .sort((a, b) => new Date(b.timestamp) - new Date(a.timestamp))[0];
+            .sort((a, b) => b.timestamp - a.timestamp)[0];
     }).filter(Boolean);
 
     // Main Content Display
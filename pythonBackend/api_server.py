@@ -1,11 +1,18 @@
 import http.server
-import socketserver
-import json
-from urllib.parse import urlparse
-from data_generator import get_initial_data
-from redis_state import initialize_prices, is_redis_available
-from datetime import datetime
-from collections import deque
+import functools
+import hashlib
+import logging
+import logging.handlers
+import queue
+import orjson
+import ormsgpack
+from data_generator import get_initial_columns, iter_initial_data
+from redis_state import (
+    initialize_prices,
+    is_redis_available,
+    get_cached_response,
+    set_cached_response
+)
 
 import os
 from dotenv import load_dotenv
@@ -14,84 +21,224 @@ from dotenv import load_dotenv
 load_dotenv()
 PORT = int(os.getenv("PORT", 8000))
 API_ENDPOINT = os.getenv("API_ENDPOINT", "/api/initial_data")
+HISTORY_SIZE = 50 # Historical points per asset in the initial data
+INITIAL_DATA_CACHE_TTL = int(os.getenv("INITIAL_DATA_CACHE_TTL", 2)) # Seconds; 0 disables caching
+INITIAL_DATA_CACHE_KEY = f"initial_data:{HISTORY_SIZE}"
+JSON_CONTENT_TYPE = "application/json"
+MSGPACK_CONTENT_TYPE = "application/msgpack" # Binary variant for clients that opt in
+NDJSON_CONTENT_TYPE = "application/x-ndjson" # Streamed variant, one data point per line
+NDJSON_CHUNK_SIZE = 16 * 1024 # Bytes of NDJSON lines buffered per HTTP chunk
+DEBUG = os.getenv("DEBUG", "").lower() in ("1", "true", "yes") # Log every request to the console
+NOT_FOUND_BODY = orjson.dumps({"error": "Not Found"})
 
-# --- Rolling Event Buffer (Last 5 HTTP Events) ---
-http_event_buffer = deque(maxlen=5)
-
-def display_http_events():
-    """Display the last 5 HTTP events in a clean format."""
-    print("\n" + "="*50)
-    print("  HTTP SERVER (Last 5 Events)")
-    print("="*50)
-    if not http_event_buffer:
-        print("  [No events yet]")
-    else:
-        for event in http_event_buffer:
-            print(f"  {event}")
-    print("="*50 + "\n")
+# --- Static Response Headers ---
+@functools.lru_cache(maxsize=None)
+def static_headers(content_type):
+    """
+    Returns the headers sent with every response of a content type, encoded
+    once as a single bytes block instead of formatted header by header.
+    """
+    return (
+        # 1. CORS Headers: Must allow the React app's origin (e.g., localhost:3000)
+        "Access-Control-Allow-Origin: *\r\n"
+        "Access-Control-Allow-Methods: GET, OPTIONS\r\n"
+        "Access-Control-Allow-Headers: X-Requested-With, Content-Type\r\n"
+        # 2. Content Type Header
+        f"Content-type: {content_type}\r\n"
+    ).encode('latin-1')
+
+# --- Request Logging (Background Thread) ---
+# Handler threads only enqueue log records; a QueueListener thread does the
+# blocking console writes. Request events are INFO, so they are skipped
+# entirely unless DEBUG is set.
+logger = logging.getLogger("api_server")
+
+def start_request_logging():
+    """Attach the queue-based log handler and start its writer thread."""
+    log_queue = queue.SimpleQueue()
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", "%H:%M:%S"))
+    
+    logger.addHandler(logging.handlers.QueueHandler(log_queue))
+    logger.setLevel(logging.INFO if DEBUG else logging.WARNING)
+    logger.propagate = False
+    
+    listener = logging.handlers.QueueListener(log_queue, console_handler)
+    listener.start()
+    return listener
+
+# --- Initial Data Response (Cached in Redis) ---
+# Serializers for the column-oriented initial data, by response content type.
+# Both write the NumPy columns natively.
+INITIAL_DATA_SERIALIZERS = {
+    JSON_CONTENT_TYPE: lambda columns: orjson.dumps(columns, option=orjson.OPT_SERIALIZE_NUMPY),
+    MSGPACK_CONTENT_TYPE: lambda columns: ormsgpack.packb(columns, option=ormsgpack.OPT_SERIALIZE_NUMPY),
+}
+
+def get_initial_data_response(content_type=JSON_CONTENT_TYPE):
+    """
+    Returns the serialized initial data and its ETag.
+    
+    The mock history only needs to be fresh to within a few seconds, so the
+    serialized body is cached in Redis for INITIAL_DATA_CACHE_TTL seconds and
+    shared by every request (and every server process) in that window.
+    Each content type is cached separately.
+    """
+    cache_key = f"{INITIAL_DATA_CACHE_KEY}:{content_type}"
+    if INITIAL_DATA_CACHE_TTL > 0:
+        cached = get_cached_response(cache_key)
+        if cached is not None:
+            return cached
+    
+    # Cache miss: generate the initial data (reads from Redis), one column per field
+    columns = get_initial_columns(history_size=HISTORY_SIZE)
+    
+    # Serialize straight to bytes
+    body = INITIAL_DATA_SERIALIZERS[content_type](columns)
+    etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+    
+    if INITIAL_DATA_CACHE_TTL > 0:
+        set_cached_response(cache_key, body, etag, INITIAL_DATA_CACHE_TTL)
+    
+    return body, etag
 
 # --- Define the Custom Request Handler ---
-class SimpleAPIHandler(http.server.SimpleHTTPRequestHandler):
+class SimpleAPIHandler(http.server.BaseHTTPRequestHandler):
     """
     A custom HTTP request handler that specifically serves the initial data
     and handles CORS for cross-domain requests from the React app.
+    
+    Built on BaseHTTPRequestHandler rather than SimpleHTTPRequestHandler:
+    no files are served, so there is no per-request working-directory lookup
+    and no inherited HEAD handler exposing the backend directory.
     """
+    
+    # Keep-alive: every response carries Content-Length (or has no body),
+    # so browsers can reuse the connection for subsequent API calls
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True # Don't delay small responses (TCP_NODELAY)
+    timeout = 30 # Close idle keep-alive connections (seconds)
 
     def log_message(self, format, *args):
         """Override to suppress default request logging."""
         pass  # Suppress default logs
 
-    def _set_headers(self, status_code=200):
+    def _set_headers(self, status_code=200, content_length=None, etag=None,
+                     content_type=JSON_CONTENT_TYPE, chunked=False):
         """Sets standard headers, including required CORS headers."""
         self.send_response(status_code)
         
-        # 1. CORS Headers: Must allow the React app's origin (e.g., localhost:3000)
-        self.send_header('Access-Control-Allow-Origin', '*') 
-        self.send_header('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        self.send_header('Access-Control-Allow-Headers', 'X-Requested-With, Content-Type')
+        # 1-2. CORS and Content-Type headers, pre-encoded (same buffer send_header()
+        # writes to, which like send_header() only exists for HTTP/1.x requests)
+        if self.request_version != 'HTTP/0.9':
+            self._headers_buffer.append(static_headers(content_type))
         
-        # 2. Content Type Header
-        self.send_header('Content-type', 'application/json')
+        # 3. Content-Length (or chunked framing) lets the client reuse the connection
+        if content_length is not None:
+            self.send_header('Content-Length', str(content_length))
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        
+        # 4. Validator so repeat clients can revalidate with If-None-Match
+        if etag is not None:
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept')
         self.end_headers()
 
+    def _if_none_match(self):
+        """Returns the ETags listed in the request's If-None-Match header."""
+        header = self.headers.get('If-None-Match')
+        if not header:
+            return []
+        return [tag.strip() for tag in header.split(',')]
+
+    def _accepts_ndjson(self):
+        """True if the client asked for a streamed NDJSON response (needs HTTP/1.1 chunking)."""
+        return (
+            self.request_version != 'HTTP/1.0'
+            and NDJSON_CONTENT_TYPE in self.headers.get('Accept', '')
+        )
+
+    def _response_content_type(self):
+        """Picks the initial data format from the Accept header (JSON unless msgpack is asked for)."""
+        if MSGPACK_CONTENT_TYPE in self.headers.get('Accept', ''):
+            return MSGPACK_CONTENT_TYPE
+        return JSON_CONTENT_TYPE
+
+    def _write_chunk(self, data):
+        """Writes one chunk of a chunked transfer-encoded body."""
+        self.wfile.write(b"%X\r\n%s\r\n" % (len(data), data))
+
+    def _stream_initial_data(self):
+        """
+        Streams the initial data as NDJSON using chunked transfer encoding,
+        so the client can start parsing before the whole history is serialized.
+        """
+        self._set_headers(200, content_type=NDJSON_CONTENT_TYPE, chunked=True)
+        
+        buffer = bytearray()
+        for data_point in iter_initial_data(history_size=HISTORY_SIZE):
+            buffer += orjson.dumps(data_point, option=orjson.OPT_APPEND_NEWLINE)
+            if len(buffer) >= NDJSON_CHUNK_SIZE:
+                self._write_chunk(buffer)
+                buffer.clear()
+        
+        if buffer:
+            self._write_chunk(buffer)
+        self.wfile.write(b"0\r\n\r\n") # Last chunk
+
     def do_OPTIONS(self):
         """Handle pre-flight OPTIONS request required by CORS."""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        http_event_buffer.append(f"[{timestamp}] OPTIONS {self.path}")
-        display_http_events()
+        logger.info("OPTIONS %s", self.path)
         self._set_headers(204) # 204 No Content for successful OPTIONS
 
     def do_GET(self):
-        """Handle GET requests."""
-        # Parse the URL to get the path
-        parsed_path = urlparse(self.path)
-        path = parsed_path.path
-
-        timestamp = datetime.now().strftime("%H:%M:%S")
+        """Handle GET requests by dispatching on the path."""
+        # The request target is the path plus an optional query string
+        path = self.path.partition('?')[0]
         
-        if path == API_ENDPOINT:
-            http_event_buffer.append(f"[{timestamp}] GET {API_ENDPOINT} → 200 OK")
-            display_http_events()
-            
-            # 1. Generate the initial data (reads from Redis)
-            data = get_initial_data(history_size=50) # Request 50 historical points
-            
-            # 2. Convert data to JSON string
-            json_response = json.dumps(data)
-            
-            # 3. Send successful headers
-            self._set_headers(200)
-            
-            # 4. Write the JSON response body
-            self.wfile.write(json_response.encode('utf-8'))
-            
+        route = self.GET_ROUTES.get(path)
+        if route is not None:
+            route(self)
         else:
-            http_event_buffer.append(f"[{timestamp}] GET {path} → 404 Not Found")
-            display_http_events()
-            
-            # Handle unknown paths with 404
-            self._set_headers(404)
-            self.wfile.write(json.dumps({"error": "Not Found"}).encode('utf-8'))
+            self._handle_not_found(path)
+
+    def _handle_initial_data(self):
+        """Serve the initial data (streamed as NDJSON if the client asks for it)."""
+        if self._accepts_ndjson():
+            logger.info("GET %s → 200 OK (stream)", API_ENDPOINT)
+            self._stream_initial_data()
+            return
+        
+        # 1. Get the serialized initial data (cached in Redis) in the negotiated format
+        content_type = self._response_content_type()
+        body, etag = get_initial_data_response(content_type)
+        
+        # 2. Client already has this body: skip it entirely
+        if etag in self._if_none_match():
+            logger.info("GET %s → 304 Not Modified", API_ENDPOINT)
+            self._set_headers(304, etag=etag, content_type=content_type)
+            return
+        
+        logger.info("GET %s → 200 OK (%s)", API_ENDPOINT, content_type)
+        
+        # 3. Send successful headers
+        self._set_headers(200, len(body), etag, content_type)
+        
+        # 4. Write the response body
+        self.wfile.write(body)
+
+    def _handle_not_found(self, path):
+        """Handle unknown paths with 404."""
+        logger.info("GET %s → 404 Not Found", path)
+        self._set_headers(404, len(NOT_FOUND_BODY))
+        self.wfile.write(NOT_FOUND_BODY)
+
+    # GET path -> handler
+    GET_ROUTES = {
+        API_ENDPOINT: _handle_initial_data,
+    }
 
 # --- Server Execution ---
 def run_http_server():
@@ -117,12 +264,17 @@ def run_http_server():
     initialize_prices()
     print()
     
-    # Use socketserver to handle incoming connections
-    with socketserver.TCPServer(("", PORT), SimpleAPIHandler) as httpd:
+    log_listener = start_request_logging()
+    
+    # Handle each connection on its own thread so a slow client or a large
+    # initial_data response doesn't block other requests
+    with http.server.ThreadingHTTPServer(("", PORT), SimpleAPIHandler) as httpd:
         print("--------------------------------------------------")
         print(f"📡 HTTP API Server serving at port {PORT}")
         print(f"✅ Initial Data Endpoint: http://localhost:{PORT}{API_ENDPOINT}")
         print(f"✅ Using Redis shared state")
+        if DEBUG:
+            print(f"✅ Request logging enabled (DEBUG)")
         print("--------------------------------------------------")
         
         try:
@@ -131,6 +283,8 @@ def run_http_server():
         except KeyboardInterrupt:
             print("\n🛑 HTTP Server shut down manually.")
             httpd.shutdown()
+        finally:
+            log_listener.stop()
 
 if __name__ == "__main__":
     run_http_server()
@@ -1,68 +1,102 @@
+import asyncio
 import json
-import random
+import orjson
+import numpy as np
 import time
-import uuid
-from datetime import datetime, timezone, timedelta
+import threading
+from datetime import datetime
 from redis_state import (
-    get_price, 
-    set_price, 
+    get_prices_bulk,
+    set_prices_bulk,
+    get_prices_bulk_async,
+    set_prices_bulk_async,
     get_tracked_assets,
     initialize_prices,
     is_redis_available
 )
 
+# Data point IDs come from a per-process monotonic counter (cheaper and smaller
+# than uuid4). Starting it at the current time in microseconds keeps the IDs
+# issued by the HTTP and WebSocket servers apart, since the frontend uses
+# them as React keys.
+_next_id = time.time_ns() // 1_000
+_id_lock = threading.Lock() # The HTTP server generates data on concurrent threads
+
+def _reserve_ids(count: int) -> range:
+    """Reserve a block of consecutive data point IDs."""
+    global _next_id
+    with _id_lock:
+        start = _next_id
+        _next_id += count
+    return range(start, start + count)
+
+# One PCG64 generator, seeded once, for all simulated prices and volumes
+rng = np.random.default_rng()
+
+
 # -----------------------------------------------------------
-# 1. Single Data Point Generator (Redis-backed)
+# 1. Data Batch Generator (Redis-backed)
 # -----------------------------------------------------------
-def generate_data_point(asset_id: str) -> dict:
+async def generate_data_batch(asset_ids: list, timestamp: int) -> list:
     """
-    Generates a single, time-stamped data point for a given asset.
-    Reads current price from Redis, generates new price, and updates Redis.
+    Generates one time-stamped data point for each of the given assets.
+    Reads current prices from Redis, generates new prices, and updates Redis
+    (one non-blocking round-trip each way for the whole batch).
     
     Args:
-        asset_id: Asset identifier (e.g., "BTC", "ETH")
+        asset_ids: Asset identifiers (e.g., ["BTC", "ETH"])
+        timestamp: Epoch milliseconds (UTC) shared by the whole batch
         
     Returns:
-        dict: Data point with id, asset_id, timestamp, price_usd, volume_24h
+        list: Data points with id, asset_id, timestamp, price_usd, volume_24h
     """
-    # Read current price from Redis (shared state)
-    current_price = get_price(asset_id)
+    # Read current prices from Redis (shared state)
+    current_prices = np.array(list((await get_prices_bulk_async(asset_ids)).values()))
     
-    # Simulate a small, random price change (-0.5% to +0.5% movement)
-    price_change_factor = random.uniform(0.995, 1.005)
-    new_price = current_price * price_change_factor
+    # Simulate a small, random price change for every asset at once (-0.5% to +0.5% movement)
+    price_change_factors = rng.uniform(0.995, 1.005, len(asset_ids))
     
-    # Ensure the price is rounded nicely for display
-    new_price_rounded = round(new_price, 4)
+    # Ensure the prices are rounded nicely for display
+    new_prices = np.round(current_prices * price_change_factors, 4).tolist()
+    volumes = rng.integers(1_000_000, 10_000_001, len(asset_ids)).tolist() # Mock Volume
     
-    # Update Redis with new price (shared state)
-    set_price(asset_id, new_price_rounded)
+    # Update Redis with new prices (shared state)
+    await set_prices_bulk_async(dict(zip(asset_ids, new_prices)))
     
-    return {
-        "id": str(uuid.uuid4()),  # Unique ID for the data point
-        "asset_id": asset_id,     # Asset symbol (e.g., "BTC")
-        "timestamp": datetime.now(timezone.utc).isoformat(), # UTC Timestamp
-        "price_usd": new_price_rounded,
-        "volume_24h": random.randint(1_000_000, 10_000_000) # Mock Volume
-    }
+    return [
+        {
+            "id": point_id,           # Unique ID for the data point
+            "asset_id": asset_id,     # Asset symbol (e.g., "BTC")
+            "timestamp": timestamp,   # UTC Timestamp (epoch ms)
+            "price_usd": price,
+            "volume_24h": volume
+        }
+        for point_id, asset_id, price, volume in zip(
+            _reserve_ids(len(asset_ids)), asset_ids, new_prices, volumes
+        )
+    ]
 
 
 # -----------------------------------------------------------
-# 2. Real-Time Data Feed (Redis-backed Generator)
+# 2. Real-Time Data Feed (Redis-backed Async Generator)
 # -----------------------------------------------------------
-def generate_real_time_feed(interval_seconds: float = 1.0):
+async def generate_real_time_feed(interval_seconds: float = 1.0):
     """
-    A Python generator function that continuously yields a list of
-    new data points for all tracked assets.
+    An async generator that continuously yields a list of new data
+    points for all tracked assets.
     
     Reads current prices from Redis (shared state) and updates them.
-    This function is intended to be run by the WebSocket server.
+    This function is intended to be run by the WebSocket server; Redis
+    calls and the interval wait never block its event loop.
     
     Args:
         interval_seconds: Time delay between data batches
         
     Yields:
-        str: JSON string containing array of new data points
+        tuple: (payload, first_asset_id, first_price_usd) - payload is the UTF-8
+        JSON array of new data points (sent as a text frame payload); the first
+        point's asset and price are passed along for logging, so the server
+        never has to parse the payload back
     """
     tracked_assets = get_tracked_assets()
     
@@ -71,87 +105,146 @@ def generate_real_time_feed(interval_seconds: float = 1.0):
     print(f"✅ Using Redis shared state")
     
     while True:
-        new_data_batch = []
+        # All points in the same tick share one timestamp
+        timestamp = time.time_ns() // 1_000_000
         
-        # Generate new data point for each asset
-        for asset_id in tracked_assets:
-            # Generate data point (reads from Redis, updates Redis)
-            data_point = generate_data_point(asset_id)
-            new_data_batch.append(data_point)
+        # Generate a new data point for each asset (reads from Redis, updates Redis)
+        new_data_batch = await generate_data_batch(tracked_assets, timestamp)
         
-        # Yield the batch of new data as a JSON string
-        yield json.dumps(new_data_batch)
+        # Yield the batch of new data as UTF-8 JSON bytes, encoded once for all clients
+        first_point = new_data_batch[0]
+        yield orjson.dumps(new_data_batch), first_point["asset_id"], first_point["price_usd"]
         
         # Pause to simulate the stream interval
-        time.sleep(interval_seconds)
+        await asyncio.sleep(interval_seconds)
 
 
 # -----------------------------------------------------------
 # 3. Initial/Historical Data (Redis-backed)
 # -----------------------------------------------------------
-def get_initial_data(history_size: int = 50):
+def _simulate_history(tracked_assets: list, history_size: int):
     """
-    Generates an initial batch of historical data for the frontend
-    to load on startup (using the HTTP API).
+    Simulates historical prices for every asset, starting from the current
+    prices in Redis and walking backwards in time.
     
-    Uses current prices from Redis as the starting point and generates
-    backwards in time to create realistic historical data.
+    Also writes the final historical prices back to Redis so that the
+    history and the live feed stay continuous.
     
     Args:
+        tracked_assets: Asset identifiers, in output order
         history_size: Number of historical points to generate per asset
         
     Returns:
-        list: Array of data points sorted chronologically
+        tuple: (timestamps, prices, volumes) NumPy arrays, oldest step first -
+            epoch ms per step, and (steps, assets) prices and volumes
     """
-    initial_data = []
-    tracked_assets = get_tracked_assets()
+    # Get current prices from Redis (shared state) in one round-trip
+    # These are the starting points for the historical simulation
+    start_prices = np.array(list(get_prices_bulk(tracked_assets).values()))
+    
+    # Simulate every price step at once (-0.5% to +0.5% movement per step):
+    # one random factor per (asset, step), compounded along each asset's walk
+    factors = rng.uniform(0.995, 1.005, size=(len(tracked_assets), history_size))
+    prices = np.round(np.cumprod(factors, axis=1) * start_prices[:, None], 4)
+    volumes = rng.integers(1_000_000, 10_000_001, size=(len(tracked_assets), history_size))
     
-    # Get current prices from Redis (shared state)
-    # Create a working copy for historical simulation
-    temp_prices = {}
-    for asset_id in tracked_assets:
-        temp_prices[asset_id] = get_price(asset_id)
+    # Each step goes a random 5-15 seconds further back in history (the first step is "now")
+    time_steps = rng.uniform(5, 15, history_size)
+    time_steps[:1] = 0
+    seconds_to_subtract = np.cumsum(time_steps)
     
-    print(f"Generating {history_size} historical points from Redis state...")
+    # Calculate the historical times as epoch ms (one per step, shared by all assets)
+    now_ms = time.time_ns() // 1_000_000
+    timestamps = now_ms - (seconds_to_subtract * 1000).astype(np.int64)
     
-    # Generate 'history_size' number of data points for each asset
-    for i in range(history_size):
-        # Calculate the random time step to go back in history
-        seconds_to_subtract = i * random.uniform(5, 15)
+    # Update Redis with the final historical prices in one round-trip
+    # This ensures continuity: last historical price = first live price
+    final_prices = prices[:, -1] if history_size else start_prices
+    set_prices_bulk(dict(zip(tracked_assets, final_prices.tolist())))
+    
+    # Steps were simulated newest-first; return them oldest-first
+    return timestamps[::-1], prices.T[::-1], volumes.T[::-1]
+
+
+def iter_initial_data(history_size: int = 50):
+    """
+    Generates the initial historical data one point at a time, in
+    chronological order, so it can be streamed without building the
+    whole list first.
+    
+    The simulation (and the Redis update) runs when this is called;
+    only the data point dicts are produced lazily.
+    
+    Args:
+        history_size: Number of historical points to generate per asset
         
-        # Calculate the historical time using timedelta
-        past_time = datetime.now(timezone.utc) - timedelta(seconds=seconds_to_subtract)
+    Returns:
+        iterator: Data points sorted chronologically
+    """
+    tracked_assets = get_tracked_assets()
+    timestamps, prices, volumes = _simulate_history(tracked_assets, history_size)
+    point_ids = iter(_reserve_ids(prices.size))
+    
+    def data_points():
+        # Every asset shares its step's timestamp, so walking the steps
+        # oldest-first gives chronological output without sorting
+        for timestamp, step_prices, step_volumes in zip(
+            timestamps.tolist(), prices.tolist(), volumes.tolist()
+        ):
+            for asset_id, price, volume in zip(tracked_assets, step_prices, step_volumes):
+                yield {
+                    "id": next(point_ids),
+                    "asset_id": asset_id,
+                    "timestamp": timestamp,
+                    "price_usd": price,
+                    "volume_24h": volume
+                }
+    
+    return data_points()
+
+
+def get_initial_columns(history_size: int = 50) -> dict:
+    """
+    Generates the same historical data as get_initial_data(), but
+    column-oriented: one array per data point field instead of one dict
+    per point. No repeated key names on the wire, and orjson writes the
+    NumPy columns directly (orjson.OPT_SERIALIZE_NUMPY).
+    
+    Args:
+        history_size: Number of historical points to generate per asset
         
-        for asset_id, current_price in temp_prices.items():
-            # Simulate price change
-            price_change_factor = random.uniform(0.995, 1.005)
-            new_price = current_price * price_change_factor
-            new_price_rounded = round(new_price, 4)
-            
-            # Create data point
-            data_point = {
-                "id": str(uuid.uuid4()),
-                "asset_id": asset_id,
-                "timestamp": past_time.isoformat(),
-                "price_usd": new_price_rounded,
-                "volume_24h": random.randint(1_000_000, 10_000_000)
-            }
-            
-            initial_data.append(data_point)
-            
-            # Update temp price for the next historical step
-            temp_prices[asset_id] = new_price_rounded
-    
-    # Sort by timestamp to ensure chronological order
-    initial_data.sort(key=lambda x: x['timestamp'])
-    
-    # Update Redis with the final historical prices
-    # This ensures continuity: last historical price = first live price
-    for asset_id, final_price in temp_prices.items():
-        set_price(asset_id, final_price)
-        print(f"Historical endpoint for {asset_id}: ${final_price:.2f}")
+    Returns:
+        dict: Field name (id, asset_id, timestamp, price_usd, volume_24h) ->
+            column with one entry per data point, sorted chronologically
+    """
+    tracked_assets = get_tracked_assets()
+    timestamps, prices, volumes = _simulate_history(tracked_assets, history_size)
+    point_ids = _reserve_ids(prices.size)
+    
+    return {
+        "id": np.arange(point_ids.start, point_ids.stop, dtype=np.int64),
+        "asset_id": tracked_assets * history_size,
+        "timestamp": np.repeat(timestamps, len(tracked_assets)),
+        "price_usd": prices.ravel(),
+        "volume_24h": volumes.ravel()
+    }
+
+
+def get_initial_data(history_size: int = 50):
+    """
+    Generates an initial batch of historical data for the frontend
+    to load on startup (using the HTTP API).
+    
+    Uses current prices from Redis as the starting point and generates
+    backwards in time to create realistic historical data.
     
-    return initial_data
+    Args:
+        history_size: Number of historical points to generate per asset
+        
+    Returns:
+        list: Array of data points sorted chronologically
+    """
+    return list(iter_initial_data(history_size))
 
 
 # -----------------------------------------------------------
@@ -184,15 +277,17 @@ if __name__ == "__main__":
     
     # Test 2: Real-time feed
     print("--- Test 2: Real-Time Feed Generator ---")
-    feed = generate_real_time_feed(interval_seconds=0.5)
+    async def first_batches(count):
+        feed = generate_real_time_feed(interval_seconds=0.5)
+        return [(await feed.__anext__())[0] for _ in range(count)]
+    
+    batch_1, batch_2 = asyncio.run(first_batches(2))
     
     # First batch
-    batch_1 = next(feed)
     print(f"\nBatch 1 ({len(json.loads(batch_1))} items):")
     print(json.dumps(json.loads(batch_1), indent=2))
     
     # Second batch
-    batch_2 = next(feed)
     print(f"\nBatch 2 ({len(json.loads(batch_2))} items):")
     print(json.dumps(json.loads(batch_2), indent=2))
     
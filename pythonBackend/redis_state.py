@@ -10,13 +10,22 @@ Key Functions:
 - initialize_prices() - Set initial asset prices
 - get_price(asset_id) - Read current price for an asset
 - set_price(asset_id, price) - Update price for an asset
+- get_prices_bulk(asset_ids) / set_prices_bulk(prices) - Batched reads/writes (one round-trip)
+- get_async_redis() and get/set_prices_bulk_async() - Same, for the WebSocket server's event loop
 - get_all_prices() - Get all asset prices as dict
+- get_cached_response(key) / set_cached_response(...) - Short-lived response cache
+- publish_feed(payload) / subscribe_feed() - Fan the real-time feed out to WebSocket workers
+
+All prices live in a single Redis hash (PRICES_HASH), one field per asset.
 """
 
 import redis
+import redis.asyncio
 import json
 import os
-from typing import Dict, Optional
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -27,6 +36,7 @@ REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
 REDIS_PASSWORD = os.getenv("REDIS_PASSWORD", None)
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 32))
 
 # Initial asset prices (used for first-time initialization)
 INITIAL_PRICES = {
@@ -36,11 +46,53 @@ INITIAL_PRICES = {
     "DOGE": 0.15
 }
 
-# Price key prefix in Redis
-PRICE_KEY_PREFIX = "price:"
+# Redis hash holding all current prices (field = asset_id)
+PRICES_HASH = "prices"
+
+# Suffix for the key holding a cached response's ETag
+ETAG_KEY_SUFFIX = ":etag"
 
-# Singleton Redis connection
+# Pub/sub channel carrying serialized feed batches to WebSocket workers
+FEED_CHANNEL = "price_feed"
+
+# Singleton Redis connections
 _redis_client: Optional[redis.Redis] = None
+_redis_binary_client: Optional[redis.Redis] = None
+_redis_client_lock = threading.Lock() # Guards creation when called from server threads
+_async_redis_client: Optional[redis.asyncio.Redis] = None
+
+# Cached result of the last is_redis_available() check: (monotonic time, result)
+REDIS_PING_CACHE_SECONDS = 1.0
+_last_ping: Tuple[float, bool] = (float("-inf"), False)
+
+
+def _create_pool(decode_responses: bool, pool_class=redis.BlockingConnectionPool):
+    """
+    Create a bounded connection pool shared by all threads (or tasks) of a server.
+    
+    When all REDIS_MAX_CONNECTIONS are in use, callers wait for a free
+    connection instead of failing. redis-py already sets TCP_NODELAY on
+    every connection; TCP keepalive detects dead idle connections.
+    
+    Args:
+        decode_responses: Decode replies to strings (False for raw bytes)
+        pool_class: redis.BlockingConnectionPool, or the redis.asyncio one
+        
+    Returns:
+        New connection pool of pool_class
+    """
+    return pool_class(
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=5,  # Seconds to wait for a free connection
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        password=REDIS_PASSWORD,
+        decode_responses=decode_responses,
+        socket_connect_timeout=5,
+        socket_timeout=5,
+        socket_keepalive=True
+    )
 
 
 def get_redis() -> redis.Redis:
@@ -56,27 +108,65 @@ def get_redis() -> redis.Redis:
     global _redis_client
     
     if _redis_client is None:
-        try:
-            _redis_client = redis.Redis(
-                host=REDIS_HOST,
-                port=REDIS_PORT,
-                db=REDIS_DB,
-                password=REDIS_PASSWORD,
-                decode_responses=True,  # Automatically decode bytes to strings
-                socket_connect_timeout=5,
-                socket_timeout=5
-            )
-            # Test connection
-            _redis_client.ping()
-            print(f"✅ Redis connected: {REDIS_HOST}:{REDIS_PORT}")
-        except redis.ConnectionError as e:
-            print(f"❌ Redis connection failed: {e}")
-            print(f"Make sure Redis is running on {REDIS_HOST}:{REDIS_PORT}")
-            raise
+        with _redis_client_lock:
+            if _redis_client is None:
+                try:
+                    _redis_client = redis.Redis(
+                        connection_pool=_create_pool(decode_responses=True)  # Automatically decode bytes to strings
+                    )
+                    # Test connection
+                    _redis_client.ping()
+                    print(f"✅ Redis connected: {REDIS_HOST}:{REDIS_PORT}")
+                except redis.ConnectionError as e:
+                    print(f"❌ Redis connection failed: {e}")
+                    print(f"Make sure Redis is running on {REDIS_HOST}:{REDIS_PORT}")
+                    raise
     
     return _redis_client
 
 
+def get_redis_binary() -> redis.Redis:
+    """
+    Get or create a Redis connection that returns raw bytes (singleton pattern).
+    
+    Used for cached response bodies, which are already-serialized bytes
+    and must not be decoded to strings.
+    
+    Returns:
+        redis.Redis: Active Redis connection with decode_responses=False
+    """
+    global _redis_binary_client
+    
+    if _redis_binary_client is None:
+        with _redis_client_lock:
+            if _redis_binary_client is None:
+                _redis_binary_client = redis.Redis(
+                    connection_pool=_create_pool(decode_responses=False)
+                )
+    
+    return _redis_binary_client
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """
+    Get or create the asyncio Redis connection (singleton pattern).
+    
+    Used from the WebSocket server's event loop, so waiting on Redis never
+    blocks other clients. Connects lazily on the first command.
+    
+    Returns:
+        redis.asyncio.Redis: Redis connection that decodes replies to strings
+    """
+    global _async_redis_client
+    
+    if _async_redis_client is None:
+        _async_redis_client = redis.asyncio.Redis(
+            connection_pool=_create_pool(decode_responses=True, pool_class=redis.asyncio.BlockingConnectionPool)
+        )
+    
+    return _async_redis_client
+
+
 def initialize_prices(force: bool = False) -> None:
     """
     Initialize asset prices in Redis if they don't exist.
@@ -86,16 +176,22 @@ def initialize_prices(force: bool = False) -> None:
     """
     r = get_redis()
     
-    for asset_id, initial_price in INITIAL_PRICES.items():
-        price_key = f"{PRICE_KEY_PREFIX}{asset_id}"
-        
-        # Only set if key doesn't exist (unless force=True)
-        if force or not r.exists(price_key):
-            r.set(price_key, initial_price)
+    if force:
+        r.hset(PRICES_HASH, mapping=INITIAL_PRICES)
+        created = [True] * len(INITIAL_PRICES)
+    else:
+        # Only set fields that don't exist yet (one round-trip)
+        with r.pipeline() as pipe:
+            for asset_id, initial_price in INITIAL_PRICES.items():
+                pipe.hsetnx(PRICES_HASH, asset_id, initial_price)
+            created = pipe.execute()
+    
+    current_prices = get_all_prices()
+    for (asset_id, initial_price), was_created in zip(INITIAL_PRICES.items(), created):
+        if was_created:
             print(f"Initialized {asset_id}: ${initial_price}")
         else:
-            current_price = float(r.get(price_key))
-            print(f"Using existing {asset_id}: ${current_price}")
+            print(f"Using existing {asset_id}: ${current_prices[asset_id]}")
 
 
 def get_price(asset_id: str) -> float:
@@ -112,9 +208,8 @@ def get_price(asset_id: str) -> float:
         ValueError: If asset doesn't exist in Redis
     """
     r = get_redis()
-    price_key = f"{PRICE_KEY_PREFIX}{asset_id}"
     
-    price_str = r.get(price_key)
+    price_str = r.hget(PRICES_HASH, asset_id)
     if price_str is None:
         raise ValueError(f"Asset {asset_id} not found in Redis. Call initialize_prices() first.")
     
@@ -130,8 +225,74 @@ def set_price(asset_id: str, price: float) -> None:
         price: New price in USD
     """
     r = get_redis()
-    price_key = f"{PRICE_KEY_PREFIX}{asset_id}"
-    r.set(price_key, price)
+    r.hset(PRICES_HASH, asset_id, price)
+
+
+def get_prices_bulk(asset_ids: List[str]) -> Dict[str, float]:
+    """
+    Get current prices for several assets in a single HMGET round-trip.
+    
+    Args:
+        asset_ids: Asset identifiers (e.g., ["BTC", "ETH"])
+        
+    Returns:
+        dict: Mapping of asset_id -> price, in the order of asset_ids
+        
+    Raises:
+        ValueError: If any asset doesn't exist in Redis
+    """
+    r = get_redis()
+    return _parse_prices(asset_ids, r.hmget(PRICES_HASH, asset_ids))
+
+
+def _parse_prices(asset_ids: List[str], price_strs: List[Optional[str]]) -> Dict[str, float]:
+    """Convert HMGET replies to floats, raising ValueError for missing assets."""
+    prices = {}
+    for asset_id, price_str in zip(asset_ids, price_strs):
+        if price_str is None:
+            raise ValueError(f"Asset {asset_id} not found in Redis. Call initialize_prices() first.")
+        prices[asset_id] = float(price_str)
+    
+    return prices
+
+
+def set_prices_bulk(prices: Dict[str, float]) -> None:
+    """
+    Update prices for several assets in a single (atomic) HSET round-trip.
+    
+    Args:
+        prices: Mapping of asset_id -> new price in USD
+    """
+    r = get_redis()
+    r.hset(PRICES_HASH, mapping=prices)
+
+
+async def get_prices_bulk_async(asset_ids: List[str]) -> Dict[str, float]:
+    """
+    Async version of get_prices_bulk() (one HMGET round-trip).
+    
+    Args:
+        asset_ids: Asset identifiers (e.g., ["BTC", "ETH"])
+        
+    Returns:
+        dict: Mapping of asset_id -> price, in the order of asset_ids
+        
+    Raises:
+        ValueError: If any asset doesn't exist in Redis
+    """
+    r = get_async_redis()
+    return _parse_prices(asset_ids, await r.hmget(PRICES_HASH, asset_ids))
+
+
+async def set_prices_bulk_async(prices: Dict[str, float]) -> None:
+    """
+    Async version of set_prices_bulk() (one atomic HSET round-trip).
+    
+    Args:
+        prices: Mapping of asset_id -> new price in USD
+    """
+    r = get_async_redis()
+    await r.hset(PRICES_HASH, mapping=prices)
 
 
 def get_all_prices() -> Dict[str, float]:
@@ -142,15 +303,85 @@ def get_all_prices() -> Dict[str, float]:
         dict: Mapping of asset_id -> price (e.g., {"BTC": 60123.45, "ETH": 3521.00})
     """
     r = get_redis()
-    prices = {}
     
-    for asset_id in INITIAL_PRICES.keys():
-        price_key = f"{PRICE_KEY_PREFIX}{asset_id}"
-        price_str = r.get(price_key)
-        if price_str:
-            prices[asset_id] = float(price_str)
+    return {
+        asset_id: float(price_str)
+        for asset_id, price_str in r.hgetall(PRICES_HASH).items()
+    }
+
+
+def get_cached_response(cache_key: str) -> Optional[Tuple[bytes, str]]:
+    """
+    Get a cached response body and its ETag from Redis.
     
-    return prices
+    Args:
+        cache_key: Key the response was cached under (e.g., "initial_data:50")
+        
+    Returns:
+        tuple: (body, etag), or None if the entry is missing or expired
+    """
+    r = get_redis_binary()
+    body, etag = r.mget(cache_key, f"{cache_key}{ETAG_KEY_SUFFIX}")
+    if body is None or etag is None:
+        return None
+    
+    return body, etag.decode("utf-8")
+
+
+def set_cached_response(cache_key: str, body: bytes, etag: str, ttl_seconds: int) -> None:
+    """
+    Cache a response body and its ETag in Redis with a short TTL.
+    
+    Args:
+        cache_key: Key to cache the response under
+        body: Serialized response body
+        etag: ETag identifying this body
+        ttl_seconds: Time-to-live for both keys
+    """
+    r = get_redis_binary()
+    with r.pipeline() as pipe:
+        pipe.set(cache_key, body, ex=ttl_seconds)
+        pipe.set(f"{cache_key}{ETAG_KEY_SUFFIX}", etag, ex=ttl_seconds)
+        pipe.execute()
+
+
+async def publish_feed(payload: bytes) -> None:
+    """
+    Publish one serialized feed batch to every subscribed WebSocket worker.
+    
+    Args:
+        payload: Serialized batch, sent to clients as-is
+    """
+    r = get_async_redis()
+    await r.publish(FEED_CHANNEL, payload)
+
+
+async def subscribe_feed() -> AsyncIterator[bytes]:
+    """
+    Yield feed batches published by publish_feed(), in order.
+    
+    Uses a dedicated asyncio connection, since a subscribed connection
+    cannot run other commands.
+    
+    Yields:
+        bytes: Serialized batch, exactly as published
+    """
+    r = redis.asyncio.Redis(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        db=REDIS_DB,
+        password=REDIS_PASSWORD,
+        socket_connect_timeout=5,
+        socket_keepalive=True
+    )
+    pubsub = r.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(FEED_CHANNEL)
+    try:
+        async for message in pubsub.listen():
+            yield message["data"]
+    finally:
+        await pubsub.aclose()
+        await r.aclose()
 
 
 def get_tracked_assets() -> list:
@@ -168,15 +399,29 @@ def is_redis_available() -> bool:
     """
     Check if Redis is available without raising an error.
     
+    The result is cached for REDIS_PING_CACHE_SECONDS so frequent callers
+    don't add a PING round-trip each time (once connected, individual
+    commands fail on their own if Redis goes away).
+    
     Returns:
         bool: True if Redis is connected, False otherwise
     """
+    global _last_ping
+    
+    checked_at, available = _last_ping
+    now = time.monotonic()
+    if now - checked_at < REDIS_PING_CACHE_SECONDS:
+        return available
+    
     try:
         r = get_redis()
         r.ping()
-        return True
+        available = True
     except (redis.ConnectionError, Exception):
-        return False
+        available = False
+    
+    _last_ping = (now, available)
+    return available
 
 
 if __name__ == "__main__":
@@ -1,11 +1,16 @@
 import asyncio
+import multiprocessing
 import websockets
-from websockets.server import WebSocketServerProtocol
-from websockets.exceptions import ConnectionClosed, ConnectionClosedError
-import json
-from datetime import datetime
+from websockets.asyncio.server import ServerConnection
+from websockets.protocol import State
+import orjson
+import signal
+import socket
+import struct
+import sys
+import time
 from data_generator import generate_real_time_feed
-from redis_state import initialize_prices, is_redis_available
+from redis_state import initialize_prices, is_redis_available, publish_feed, subscribe_feed
 from collections import deque
 
 from dotenv import load_dotenv
@@ -14,35 +19,94 @@ import os
 # --- Configuration ---
 load_dotenv()
 WS_PORT = int(os.getenv("WS_PORT", 8001))
+WS_WORKERS = int(os.getenv("WS_WORKERS", 1)) # Processes sharing WS_PORT via SO_REUSEPORT (Linux only)
+FEED_INTERVAL = float(os.getenv("FEED_INTERVAL", 0.5))
 CONNECTED_CLIENTS = set() # Set to store active WebSocket connections
+SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 128)) # Unsent broadcasts buffered per client before it counts as slow
+LOG_EVERY = int(os.getenv("WS_LOG_EVERY", 0)) # Log every Nth broadcast (0 = don't log broadcasts)
+SNDBUF = int(os.getenv("WS_SNDBUF", 0)) # Per-client socket send buffer in bytes (0 = kernel default/autotuning)
+PIN_CPU = os.getenv("WS_PIN_CPU") # Optional CPU to pin the server to (Linux only)
+NIC_QUEUE_IRQ_TAGS = ("-rx", "-tx", "TxRx", "-input.", "-output.") # How NIC queue IRQs are named in /proc/interrupts
+LOG_REDRAW_INTERVAL = 0.5 # Seconds between event panel redraws
 
 # --- Rolling Event Buffer (Last 5 WebSocket Events) ---
 ws_event_buffer = deque(maxlen=5)
+LOG_Q = None # Pending (time, format, args) events for _logger_loop(); created on the running loop by serve()
 
 def display_ws_events():
-    """Display the last 5 WebSocket events in a clean format."""
-    print("\n" + "="*50)
-    print("  WEBSOCKET SERVER (Last 5 Events)")
-    print("="*50)
-    if not ws_event_buffer:
-        print("  [No events yet]")
-    else:
-        for event in ws_event_buffer:
-            print(f"  {event}")
-    print("="*50 + "\n")
+    """Display the last 5 WebSocket events in a clean format (one write to stdout)."""
+    rule = "="*50
+    events = [f"  {event}" for event in ws_event_buffer] or ["  [No events yet]"]
+    sys.stdout.write("\n".join(["", rule, "  WEBSOCKET SERVER (Last 5 Events)", rule, *events, rule, "", ""]))
+    sys.stdout.flush()
+
+def log_ws_event(fmt: str, *args):
+    """
+    Queue an event for the logger task; formatting and printing happen off
+    the connection/broadcast path. Events are dropped if the queue is full
+    or not created yet.
+    """
+    if LOG_Q is None:
+        return
+    try:
+        LOG_Q.put_nowait((time.time(), fmt, args))
+    except asyncio.QueueFull:
+        pass
+
+async def _logger_loop():
+    """
+    Formats queued events into ws_event_buffer and redraws the event panel,
+    at most once every LOG_REDRAW_INTERVAL seconds.
+    """
+    while True:
+        event = await LOG_Q.get()
+        while event is not None:
+            logged_at, fmt, args = event
+            try:
+                message = fmt % args
+            except (TypeError, ValueError):
+                # A malformed event must never stop the logger (and with it the server)
+                message = f"{fmt} {args!r}"
+            ws_event_buffer.append(f"[{time.strftime('%H:%M:%S', time.localtime(logged_at))}] {message}")
+            event = LOG_Q.get_nowait() if not LOG_Q.empty() else None
+        display_ws_events()
+        await asyncio.sleep(LOG_REDRAW_INTERVAL)
 
 # --- Helper: Remove Dead Connection ---
-def remove_client(websocket: WebSocketServerProtocol, reason: str = "disconnect"):
+def remove_client(websocket: ServerConnection, reason: str = "disconnect"):
     """
     Proactively remove a client from CONNECTED_CLIENTS.
     This should be called immediately when a connection is detected as dead.
     """
-    if websocket in CONNECTED_CLIENTS:
-        CONNECTED_CLIENTS.remove(websocket)
-        timestamp = datetime.now().strftime("%H:%M:%S")
+    count = len(CONNECTED_CLIENTS)
+    CONNECTED_CLIENTS.discard(websocket)
+    if len(CONNECTED_CLIENTS) != count:
         client_ip = websocket.remote_address[0] if websocket.remote_address else "unknown"
-        ws_event_buffer.append(f"[{timestamp}] REMOVED {client_ip} ({reason}) (total: {len(CONNECTED_CLIENTS)})")
-        display_ws_events()
+        log_ws_event("REMOVED %s (%s) (total: %d)", client_ip, reason, len(CONNECTED_CLIENTS))
+
+def remove_clients(websockets_to_remove: list, reason: str):
+    """
+    Remove several clients at once (e.g. every slow client of one tick)
+    with a single set update and a single log event.
+    """
+    count = len(CONNECTED_CLIENTS)
+    CONNECTED_CLIENTS.difference_update(websockets_to_remove)
+    removed = count - len(CONNECTED_CLIENTS)
+    if removed:
+        log_ws_event("REMOVED %d clients (%s) (total: %d)", removed, reason, len(CONNECTED_CLIENTS))
+
+# --- Helper: Tune Accepted Socket ---
+def tune_client_socket(websocket):
+    """
+    Disable Nagle on a client's socket (so each small broadcast goes out
+    immediately) and apply WS_SNDBUF if set.
+    """
+    sock = websocket.transport.get_extra_info("socket")
+    if sock is None:
+        return
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    if SNDBUF:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SNDBUF)
 
 # --- 1. Client Connection Handler ---
 async def handler(websocket):
@@ -50,14 +114,13 @@ async def handler(websocket):
     Handles a single client connection, adding it to the broadcast list
     and removing it upon disconnect.
     """
+    tune_client_socket(websocket)
+    
     # Register client connection
     CONNECTED_CLIENTS.add(websocket)
     
     client_ip = websocket.remote_address[0]
-    timestamp = datetime.now().strftime("%H:%M:%S")
-    
-    ws_event_buffer.append(f"[{timestamp}] CLIENT_CONNECT {client_ip} (total: {len(CONNECTED_CLIENTS)})")
-    display_ws_events()
+    log_ws_event("CLIENT_CONNECT %s (total: %d)", client_ip, len(CONNECTED_CLIENTS))
 
     try:
         await websocket.wait_closed()
@@ -65,9 +128,7 @@ async def handler(websocket):
     except websockets.exceptions.ConnectionClosedOK:
         pass
     except Exception as e:
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        ws_event_buffer.append(f"[{timestamp}] ERROR {client_ip}: {str(e)[:30]}")
-        display_ws_events()
+        log_ws_event("ERROR %s: %s", client_ip, str(e)[:30])
         
     finally:
         # Belt-and-suspenders: remove on finally (may already be removed by broadcast loop)
@@ -75,98 +136,163 @@ async def handler(websocket):
 
 
 # --- 2. Real-Time Data Broadcaster (Zombie-Safe) ---
-async def data_streamer():
+def text_frame_header(length: int) -> bytes:
+    """
+    Build the header of an unmasked, unfragmented server-to-client text
+    frame (RFC 6455 section 5.2) for a payload of the given length.
+    """
+    if length < 126:
+        return bytes((0x81, length))
+    if length < 1 << 16:
+        return struct.pack("!BBH", 0x81, 126, length)
+    return struct.pack("!BBQ", 0x81, 127, length)
+
+
+async def published_feed():
+    """
+    Batches published by the supervisor, in the same (payload, first asset,
+    first price) shape as generate_real_time_feed(). The logged fields are
+    None: data_streamer() reads them from the payload on the ticks it logs.
+    """
+    async for data_to_send in subscribe_feed():
+        yield data_to_send, None, None
+
+
+async def data_streamer(feed):
     """
-    Continuously generates data and broadcasts it to all connected clients.
-    Uses Redis-backed data generator for shared state.
+    Continuously broadcasts each batch from the feed to all connected clients.
+    The feed is either the Redis-backed generate_real_time_feed() or, with
+    several workers, the batches the supervisor publishes (published_feed()).
     
     ZOMBIE-SAFE IMPLEMENTATION:
     - Filters closed connections before broadcast
     - Proactively removes failed connections
     - Never accumulates dead sockets
     """
-    # Get the data generator (reads/writes to Redis)
-    interval = float(os.getenv("FEED_INTERVAL", 0.5))
-    feed_generator = generate_real_time_feed(interval_seconds=interval)
-    
-    while True:
-        # Get the next batch of data (JSON string)
-        data_to_send = next(feed_generator)
+    tick = 0
+    async for data_to_send, first_asset_id, first_price in feed:
+        # data_to_send: the next batch of data (UTF-8 JSON bytes, shared by every client)
+        tick += 1
+        
+        # Every LOG_EVERY ticks, log the first asset in the batch as representative
+        if LOG_EVERY and tick % LOG_EVERY == 0:
+            if first_asset_id is None:
+                # Published batches arrive without the logged fields
+                first_point = orjson.loads(data_to_send)[0]
+                first_asset_id, first_price = first_point["asset_id"], first_point["price_usd"]
+            log_ws_event("BROADCAST %s $%.2f (%d clients)", first_asset_id, first_price, len(CONNECTED_CLIENTS))
         
-        # Parse to get asset info for logging
-        try:
-            data_batch = json.loads(data_to_send)
-            if data_batch and len(data_batch) > 0:
-                # Log first asset in batch as representative
-                first_asset = data_batch[0]
-                timestamp = datetime.now().strftime("%H:%M:%S")
-                ws_event_buffer.append(
-                    f"[{timestamp}] BROADCAST {first_asset['asset_id']} ${first_asset['price_usd']:.2f} "
-                    f"({len(CONNECTED_CLIENTS)} clients)"
-                )
-                display_ws_events()
-        except:
-            pass  # Skip logging if parsing fails
-        print(f"[BROADCAST] Sending to {len(CONNECTED_CLIENTS)} clients")
         # ============================================================
-        # ZOMBIE-SAFE BROADCAST: Fail-Fast Cleanup on Send Errors
+        # ZOMBIE-SAFE BROADCAST: One Prebuilt Frame, Fail-Fast Cleanup
         # ============================================================
-        # We cannot rely on client.open (not available on ServerConnection)
-        # Instead, we use send() errors as the liveness check
-        # Dead connections will fail immediately and be removed proactively
+        # Every client gets the identical text frame, so build its header
+        # once and write header + payload straight to each transport
+        # (non-blocking; websockets' send() would rebuild the header for
+        # every client). writelines() hands both buffers to the socket
+        # without concatenating them into a copy of the payload.
+        # Connections that are no longer OPEN are skipped; handler() removes them.
+        frame = (text_frame_header(len(data_to_send)), data_to_send)
+        max_buffered = SEND_QUEUE_SIZE * (len(frame[0]) + len(data_to_send))
         
-        # Create broadcast tasks for all current clients
-        # safe_send() will remove any that fail
-        broadcast_tasks = []
-        for client in list(CONNECTED_CLIENTS):  # Copy to avoid modification during iteration
-            broadcast_tasks.append(safe_send(client, data_to_send))
+        slow_clients = []
+        for client in CONNECTED_CLIENTS:
+            transport = client.transport
+            if client.state is not State.OPEN or transport.is_closing():
+                continue
+            if transport.get_write_buffer_size() > max_buffered:
+                slow_clients.append(client)
+                continue
+            transport.writelines(frame)
         
-        # Wait for all broadcasts to complete
-        if broadcast_tasks:
-            await asyncio.gather(*broadcast_tasks, return_exceptions=True)
- 
-        
-        # Yield control back to the asyncio loop
-        await asyncio.sleep(0)
+        # Drop clients that fell SEND_QUEUE_SIZE broadcasts behind. A close
+        # handshake would queue behind the backlog too, so abort the TCP
+        # connection; handler() then finishes its cleanup.
+        if slow_clients:
+            remove_clients(slow_clients, "slow_client")
+            for client in slow_clients:
+                client.transport.abort()
 
 
-async def safe_send(websocket: WebSocketServerProtocol, message: str):
+# --- 3. Server Execution ---
+def pin_to_cpu(cpu: int):
     """
-    Safely send a message to a WebSocket, with fail-fast cleanup.
-    
-    If send fails (ConnectionClosed, RuntimeError), immediately remove
-    the client from CONNECTED_CLIENTS without waiting for TCP timeout.
+    Pin this process to a single CPU and list the NIC queue IRQs, so the
+    operator can route them to the same core (Linux only).
     """
+    if not hasattr(os, "sched_setaffinity"):
+        print("⚠️  WS_PIN_CPU is only supported on Linux, ignoring")
+        return
+    
     try:
-        await websocket.send(message)
-    except (ConnectionClosed, ConnectionClosedError, RuntimeError) as e:
-        # Fail-fast cleanup: immediately remove dead connection
-        remove_client(websocket, f"send_error_{type(e).__name__}")
-    except Exception as e:
-        # Catch-all for unexpected errors
-        remove_client(websocket, f"unknown_error_{type(e).__name__}")
+        os.sched_setaffinity(0, {cpu})
+    except OSError as e:
+        print(f"⚠️  Could not pin to CPU {cpu} ({e}), ignoring WS_PIN_CPU")
+        return
+    print(f"📌 Pinned to CPU {cpu}")
+    
+    try:
+        with open("/proc/interrupts") as f:
+            next(f)  # Header row (one column per CPU)
+            nic_irqs = [line.split() for line in f]
+    except OSError:
+        return
+    
+    nic_irqs = [fields for fields in nic_irqs if fields and any(tag in fields[-1] for tag in NIC_QUEUE_IRQ_TAGS)]
+    for fields in nic_irqs:
+        irq = fields[0].rstrip(":")
+        print(f"   NIC IRQ {irq} ({fields[-1]}): echo {cpu} > /proc/irq/{irq}/smp_affinity_list")
+
+def check_redis() -> bool:
+    """Check Redis availability, printing setup help if it is not running."""
+    if is_redis_available():
+        return True
+    
+    print("\n" + "="*60)
+    print(" Redis Connection Required")
+    print("="*60)
+    print("\nThe WebSocket server requires Redis for shared state management.")
+    print("\nPlease start Redis before running the server:")
+    print("  Windows: memurai")
+    print("  Linux/Mac: redis-server")
+    print("\nOr install Redis:")
+    print("  Windows: choco install memurai")
+    print("  Ubuntu: sudo apt install redis-server")
+    print("  macOS: brew install redis")
+    print("\n" + "="*60 + "\n")
+    return False
+
+
+async def serve(feed, reuse_port: bool = False):
+    """
+    Runs the WebSocket server, broadcasting every batch from the feed,
+    together with the event logger.
+    """
+    global LOG_Q
+    
+    # Create the event queue here rather than at import, so it belongs to
+    # the running loop (Python 3.9 binds queues to the loop at construction)
+    LOG_Q = asyncio.Queue(maxsize=1024)
+    
+    # Start the WebSocket server (handler function manages connections).
+    # permessage-deflate is off: it would compress every broadcast once per
+    # client, and the small JSON batches gain little from it.
+    server_task = websockets.serve(handler, "localhost", WS_PORT, compression=None, reuse_port=reuse_port)
+    
+    # Start the continuous data streaming task and the event logger
+    streamer_task = asyncio.create_task(data_streamer(feed))
+    logger_task = asyncio.create_task(_logger_loop())
+    
+    # Run the server, streamer and logger tasks until they complete (which is never, in a server)
+    await asyncio.gather(server_task, streamer_task, logger_task)
 
 
-# --- 3. Server Execution ---
 async def main():
     """
     Starts the WebSocket server and the data streaming task concurrently.
     Initializes Redis state before starting the stream.
     """
     # Check Redis availability
-    if not is_redis_available():
-        print("\n" + "="*60)
-        print(" Redis Connection Required")
-        print("="*60)
-        print("\nThe WebSocket server requires Redis for shared state management.")
-        print("\nPlease start Redis before running the server:")
-        print("  Windows: memurai")
-        print("  Linux/Mac: redis-server")
-        print("\nOr install Redis:")
-        print("  Windows: choco install memurai")
-        print("  Ubuntu: sudo apt install redis-server")
-        print("  macOS: brew install redis")
-        print("\n" + "="*60 + "\n")
+    if not check_redis():
         return
     
     # Initialize Redis prices
@@ -174,31 +300,106 @@ async def main():
     initialize_prices()
     print()
     
-    # Start the WebSocket server (handler function manages connections)
-    server_task = websockets.serve(handler, "localhost", WS_PORT)
+    if PIN_CPU:
+        pin_to_cpu(int(PIN_CPU))
     
-    # Start the continuous data streaming task
-    streamer_task = asyncio.create_task(data_streamer())
-
     print("--------------------------------------------------")
     print(f"🚀 WebSocket Server running on ws://localhost:{WS_PORT}")
     print(f"✅ Using Redis shared state")
     print(f"✅ Zombie-safe broadcast enabled")
     print("--------------------------------------------------")
     
-    # Run both the server and the streamer tasks until they complete (which is never, in a server)
-    await asyncio.gather(server_task, streamer_task)
+    await serve(generate_real_time_feed(interval_seconds=FEED_INTERVAL))
+
+
+# --- 4. Multi-Process Mode (WS_WORKERS > 1) ---
+def run_event_loop(coro):
+    """Run coro on the libuv-based event loop where available (not on Windows)."""
+    try:
+        import uvloop
+    except ImportError:
+        return asyncio.run(coro)
+    return uvloop.run(coro)
+
+
+def run_worker(worker_id: int):
+    """
+    Worker process: accepts its share of clients on WS_PORT (SO_REUSEPORT)
+    and broadcasts the batches published by the supervisor.
+    """
+    if PIN_CPU:
+        # One core per worker, starting at WS_PIN_CPU and wrapping around
+        pin_to_cpu((int(PIN_CPU) + worker_id) % os.cpu_count())
+    
+    try:
+        run_event_loop(serve(published_feed(), reuse_port=True))
+    except KeyboardInterrupt:
+        pass
+
+
+async def publish_loop(workers: list):
+    """
+    Generates the feed once and publishes every batch to the workers.
+    Stops the server if a worker exits, rather than keep serving with fewer.
+    """
+    async for data_to_send, _, _ in generate_real_time_feed(interval_seconds=FEED_INTERVAL):
+        dead_workers = [worker for worker in workers if not worker.is_alive()]
+        if dead_workers:
+            for worker in dead_workers:
+                print(f"❌ WebSocket worker {worker.name} exited (code {worker.exitcode})")
+            raise SystemExit(1)
+        
+        await publish_feed(data_to_send)
+
+
+def run_workers():
+    """
+    Supervisor: starts WS_WORKERS worker processes, then generates the feed
+    once and publishes each batch to all of them through Redis pub/sub, so
+    every client sees the same prices whichever worker it landed on.
+    """
+    if not check_redis():
+        return
+    
+    print("\n📊 Initializing Redis state...")
+    initialize_prices()
+    print()
+    
+    workers = [
+        multiprocessing.Process(target=run_worker, args=(worker_id,), name=f"ws-worker-{worker_id}", daemon=True)
+        for worker_id in range(WS_WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+    
+    # Stop the workers on SIGTERM as well as Ctrl+C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    
+    print("--------------------------------------------------")
+    print(f"🚀 WebSocket Server running on ws://localhost:{WS_PORT} ({WS_WORKERS} workers)")
+    print(f"✅ Using Redis shared state")
+    print(f"✅ Zombie-safe broadcast enabled")
+    print("--------------------------------------------------")
+    
+    try:
+        run_event_loop(publish_loop(workers))
+    finally:
+        for worker in workers:
+            worker.terminate()
+
 
 if __name__ == "__main__":
     try:
-        # Run the main asynchronous function
-        asyncio.run(main())
+        # Only Linux spreads accepted connections across SO_REUSEPORT sockets
+        if WS_WORKERS > 1 and sys.platform == "linux":
+            run_workers()
+        else:
+            if WS_WORKERS > 1:
+                print("⚠️  WS_WORKERS is only supported on Linux, ignoring")
+            
+            # Run the main asynchronous function
+            run_event_loop(main())
     except KeyboardInterrupt:
         print("\n🛑 WebSocket Server shut down manually.")
     except Exception as e:
         print(f"An error occurred: {e}")
-
-
-
-# This fix corresponds to Bug Fix #5 (corrected numbering).
-# Previous reference to Bug Fix #6 was a labeling mistake.